@@ -0,0 +1,258 @@
+"""Headless prediction API for mobile and field devices, alongside the Streamlit UI.
+
+    python api_server.py --port 8600
+
+    POST /v1/predict          one image, raw body or multipart field "image"
+    POST /v1/predict/batch    multipart, one or more "images" fields
+    GET  /healthz             process is up
+    GET  /readyz              model loaded and serving (503 while idle, loading or after a failed load)
+    GET  /metrics             Prometheus metrics (see metrics.py)
+
+Uses the same registry, prediction cache, micro-batcher and class table as the
+Disease Recognition page. Requests wait in a bounded queue; when it is full
+the server answers 429 instead of letting latency grow without limit.
+``make_app`` builds the application without binding a port, so it can be
+driven in-process with ``tornado.testing.AsyncHTTPTestCase``.
+"""
+import argparse
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.ioloop
+import tornado.web
+
+import settings
+from batching import MicroBatcher, get_batcher
+from inference import predict
+from labels import CLASS_TABLE
+from metrics import METRICS
+from model_registry import ModelLoadError, get_registry
+from prediction_cache import content_digest, get_prediction_cache
+from preprocessing import new_batch, preprocess_into
+
+
+class UndecodableImage(ValueError):
+    """An uploaded image could not be decoded; reported per image, never as a server error."""
+
+
+class ModelUnavailable(tornado.web.HTTPError):
+    """503 for requests that arrive after the model failed to load, carrying the load error."""
+
+    def __init__(self, error):
+        super().__init__(503, reason="model failed to load")
+        self.error = error
+
+
+class PredictionService:
+    """Admission control plus the worker pool that decodes and predicts off the event loop."""
+
+    def __init__(self, registry=None, batcher=None, cache=None, workers=settings.API_WORKERS,
+                 max_queue=settings.API_MAX_QUEUE):
+        self.registry = registry or get_registry()
+        self.cache = cache or get_prediction_cache()
+        # A registry passed in gets a batcher of its own, so its requests never reach the process-wide model
+        self._own_batcher = batcher is None and registry is not None
+        self.batcher = batcher or (MicroBatcher(self.registry) if self._own_batcher else get_batcher())
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        METRICS.add_collector(self._collect)
+
+    def _collect(self, metrics):
+        metrics.set_gauge("leaf_api_pending_images", self.pending, help="Images admitted and not yet answered")
+        metrics.set_gauge("leaf_api_rejected_requests", self.rejected, help="Requests rejected with 429")
+
+    def try_admit(self, count):
+        with self._lock:
+            if self.pending + count > self.max_queue:
+                self.rejected += 1
+                return False
+            self.pending += count
+            return True
+
+    def release(self, count):
+        with self._lock:
+            self.pending -= count
+
+    @staticmethod
+    def _decode(image_bytes):
+        image = new_batch(1)[0]
+        try:
+            preprocess_into(image_bytes, image)
+        except Exception as exc:  # also Pillow's DecompressionBombError, which is not an OSError
+            raise UndecodableImage(f"could not decode image: {exc}") from exc
+        return image
+
+    def _predict(self, image_bytes, top_k):
+        with METRICS.trace("api_predict", bytes=len(image_bytes)) as request_log:
+            model_version = self.registry.get().version
+            try:
+                # Hashed first; the image is only decoded when the cache has no answer for it
+                predictions = predict(content_digest(image_bytes), lambda: self._decode(image_bytes),
+                                      self.registry, self.batcher, self.cache)
+            except UndecodableImage as exc:
+                request_log["error"] = "decode"
+                return {"error": str(exc)}
+            with METRICS.stage("postprocess"):
+                top = CLASS_TABLE.top_k(predictions, top_k)
+            request_log["prediction"] = top[0][0].label
+        return {
+            "class_name": top[0][0].label,
+            "advice": top[0][0].advice,
+            "top_k": [{"label": info.label, "probability": prob} for info, prob in top],
+            "model_version": model_version,
+        }
+
+    async def predict(self, image_bytes, top_k):
+        return await tornado.ioloop.IOLoop.current().run_in_executor(self._pool, self._predict, image_bytes, top_k)
+
+    def close(self):
+        METRICS.remove_collector(self._collect)
+        self._pool.shutdown(wait=False)
+        if self._own_batcher:
+            self.batcher.close()
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service, max_body_bytes, max_images):
+        self.service = service
+        self.max_body_bytes = max_body_bytes
+        self.max_images = max_images
+
+    def prepare(self):
+        length = int(self.request.headers.get("Content-Length", 0) or 0)
+        if length > self.max_body_bytes:
+            raise tornado.web.HTTPError(413, reason=f"request body over {self.max_body_bytes} bytes")
+
+    def on_finish(self):
+        METRICS.inc("leaf_api_requests_total", help="API requests by handler and status",
+                    handler=type(self).__name__, status=self.get_status())
+
+    def write_error(self, status_code, **kwargs):
+        # send_error() clears every header before calling this, so Retry-After is set here
+        if status_code == 429:
+            self.set_header("Retry-After", "1")
+        exception = kwargs["exc_info"][1] if "exc_info" in kwargs else None
+        if isinstance(exception, ModelUnavailable):
+            # Same body as /readyz reports for a failed load
+            self.finish({"status": "error", "error": exception.error})
+            return
+        self.finish({"error": self._reason, "status": status_code})
+
+    def top_k(self):
+        try:
+            return max(1, min(int(self.get_argument("top_k", "3")), len(CLASS_TABLE)))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="top_k must be an integer")
+
+    async def run(self, images):
+        if not images:
+            raise tornado.web.HTTPError(400, reason="no image in request")
+        if len(images) > self.max_images:
+            raise tornado.web.HTTPError(413, reason=f"at most {self.max_images} images per request")
+        top_k = self.top_k()
+        if not self.service.try_admit(len(images)):
+            raise tornado.web.HTTPError(429, reason="prediction queue is full")
+        try:
+            # Submitted together so the micro-batcher can group them into one forward pass
+            results = await asyncio.gather(*(self.service.predict(data, top_k) for _, data in images))
+        except ModelLoadError as exc:
+            raise ModelUnavailable(str(self.service.registry.load_error or exc)) from exc
+        finally:
+            self.service.release(len(images))
+        return [dict(result, filename=name) for (name, _), result in zip(images, results)]
+
+
+class PredictHandler(BaseHandler):
+    async def post(self):
+        files = self.request.files.get("image")
+        images = [(files[0]["filename"], files[0]["body"])] if files else []
+        if not images and self.request.body:
+            images = [("", self.request.body)]
+        result = (await self.run(images))[0]
+        if "error" in result:
+            # Written directly: decoder messages are not always valid HTTP reason phrases
+            self.set_status(400)
+            self.finish({"error": result["error"], "status": 400})
+            return
+        self.finish(result)
+
+
+class BatchPredictHandler(BaseHandler):
+    async def post(self):
+        images = [(f["filename"], f["body"]) for f in self.request.files.get("images", [])]
+        self.finish({"results": await self.run(images)})
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.finish({"status": "ok"})
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(METRICS.render_prometheus())
+
+
+class ReadyHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def get(self):
+        # Only reads the registry's state; a load in progress must never hold up the event loop
+        registry = self.service.registry
+        status = registry.status
+        if status == "error":
+            self.set_status(503)
+            self.finish({"status": "error", "error": str(registry.load_error)})
+            return
+        if status != "ready":
+            # "loading", or "idle" when nothing has started a load yet
+            self.set_status(503)
+            self.finish({"status": status})
+            return
+        self.finish({
+            "status": "ready",
+            "model_version": registry.get().version,
+            "pending": self.service.pending,
+            "rejected": self.service.rejected,
+        })
+
+
+def make_app(service=None, max_body_bytes=settings.API_MAX_BODY_BYTES, max_images=settings.API_MAX_IMAGES):
+    service = service or PredictionService()
+    limits = {"service": service, "max_body_bytes": max_body_bytes, "max_images": max_images}
+    return tornado.web.Application([
+        (r"/v1/predict", PredictHandler, limits),
+        (r"/v1/predict/batch", BatchPredictHandler, limits),
+        (r"/healthz", HealthHandler),
+        (r"/readyz", ReadyHandler, {"service": service}),
+        (r"/metrics", MetricsHandler),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.API_HOST)
+    parser.add_argument("--port", type=int, default=settings.API_PORT)
+    parser.add_argument("--workers", type=int, default=settings.API_WORKERS)
+    parser.add_argument("--max-queue", type=int, default=settings.API_MAX_QUEUE)
+    args = parser.parse_args()
+
+    service = PredictionService(workers=args.workers, max_queue=args.max_queue)
+    service.registry.load_in_background()
+    app = make_app(service)
+    # Hard cap at the connection level; handlers reject oversize requests with 413 before this
+    app.listen(args.port, args.host, max_body_size=settings.API_MAX_BODY_BYTES + 2**20)
+    print(json.dumps({"listening": f"http://{args.host}:{args.port}", "workers": args.workers,
+                      "max_queue": args.max_queue}))
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
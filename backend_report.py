@@ -0,0 +1,82 @@
+"""Accuracy-vs-latency report for the inference backends on a held-out folder.
+
+    python backend_report.py heldout/ --limit 1000 --threads 4
+
+Every backend is scored by top-1 agreement with the Keras model. When images sit
+in folders named after their class (the PlantVillage layout), top-1 accuracy
+against those labels is reported too. Latency is measured for batch-of-1 calls
+and throughput for ``--batch-size`` batches.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import settings
+from backends import BACKENDS, load_backend
+from batch_scan import iter_source
+from labels import CLASS_TABLE
+from preprocessing import load_array
+
+
+def load_heldout(source, limit):
+    images, labels = [], []
+    for name, data in iter_source(source):
+        if len(images) == limit:
+            break
+        images.append(load_array(data))
+        info = CLASS_TABLE.by_label(os.path.basename(os.path.dirname(name)))
+        labels.append(info.index if info else -1)
+    if not images:
+        raise SystemExit(f"no images found in {source}")
+    return np.stack(images).astype(np.float32), np.array(labels)
+
+
+def run_backend(backend, images, batch_size):
+    predictions = np.concatenate(
+        [backend.predict(images[i:i + batch_size]) for i in range(0, len(images), batch_size)]
+    )
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        backend.predict(images[i:i + batch_size])
+    throughput = len(images) / (time.perf_counter() - start)
+
+    latencies = []
+    for image in images[:200]:
+        start = time.perf_counter()
+        backend.predict(image[np.newaxis])
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.argmax(predictions, axis=1), throughput, np.percentile(latencies, [50, 95])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("heldout", help="directory or .zip of held-out leaf images")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=settings.TFLITE_THREADS, help="TFLite interpreter threads")
+    args = parser.parse_args()
+
+    images, labels = load_heldout(args.heldout, args.limit)
+    labelled = labels >= 0
+    print(f"{len(images)} held-out images ({labelled.sum()} with class folders), "
+          f"batch size {args.batch_size}, TFLite threads {args.threads or 'auto'}\n")
+
+    reference = None
+    print(f"{'backend':<14} {'size MB':>8} {'agree':>7} {'acc':>7} {'img/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name in ["keras"] + [b for b in args.backends if b != "keras"]:
+        backend = load_backend(name, num_threads=args.threads)
+        backend.predict(images[:1])  # warm-up
+        top1, throughput, (p50, p95) = run_backend(backend, images, args.batch_size)
+        if reference is None:
+            reference = top1
+        agreement = np.mean(top1 == reference)
+        accuracy = f"{np.mean(top1[labelled] == labels[labelled]):7.2%}" if labelled.any() else f"{'-':>7}"
+        print(f"{name:<14} {backend.weight_bytes / 2**20:8.1f} {agreement:7.2%} {accuracy} "
+              f"{throughput:8.1f} {p50:8.2f} {p95:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import threading
+
+import numpy as np
+
+import settings
+
+# TensorFlow is imported inside the backends rather than at module level, so
+# importing this module (and the app) stays cheap until a model is loaded.
+
+BACKENDS = ("keras", "tflite-float", "tflite-int8")
+
+
+class KerasBackend:
+    """Full float32 Keras model behind a compiled ``tf.function``."""
+
+    name = "keras"
+
+    def __init__(self, path, image_size=settings.IMAGE_SIZE):
+        import tensorflow as tf
+        self._tf = tf
+        self.model = tf.keras.models.load_model(path)
+        # A fixed signature with an open batch dimension traces the graph once for every batch size
+        self._infer = tf.function(
+            lambda x: self.model(x, training=False),
+            input_signature=[tf.TensorSpec((None, *image_size, 3), tf.float32)],
+        )
+        self.num_outputs = self.model.output_shape[-1]
+        self.weight_bytes = sum(int(np.prod(w.shape)) * w.dtype.size for w in self.model.weights)
+
+    def predict(self, batch):
+        return self._infer(self._tf.convert_to_tensor(batch, dtype=self._tf.float32)).numpy()
+
+
+class TFLiteBackend:
+    """TFLite interpreter for the float16 or int8 export of the model.
+
+    Resizing an interpreter reallocates all of its tensors, so instead one
+    interpreter is kept per power-of-two batch size and a batch is padded up
+    to the next one; the padding rows are sliced off the output. An
+    interpreter is not safe to share between threads, so calls are
+    serialised; batching upstream keeps it busy. Quantized int8 inputs and
+    outputs are converted from and to float32 probabilities here.
+    """
+
+    def __init__(self, path, name, num_threads=settings.TFLITE_THREADS):
+        import tensorflow as tf
+        self._tf = tf
+        self.name = name
+        self.path = path
+        self.num_threads = num_threads
+        self._interpreters = {}
+        self._lock = threading.Lock()
+        _, _, output_details, _ = self._interpreter_for(1)
+        self.num_outputs = int(output_details["shape"][-1])
+        self.weight_bytes = os.path.getsize(path)
+
+    def _interpreter_for(self, batch_size):
+        """Interpreter allocated for ``batch_size``, its input and output details and an input buffer."""
+        entry = self._interpreters.get(batch_size)
+        if entry is None:
+            interpreter = self._tf.lite.Interpreter(model_path=self.path, num_threads=self.num_threads)
+            model_input = interpreter.get_input_details()[0]
+            interpreter.resize_tensor_input(model_input["index"], [batch_size, *model_input["shape"][1:]])
+            interpreter.allocate_tensors()
+            input_details = interpreter.get_input_details()[0]
+            entry = (interpreter, input_details, interpreter.get_output_details()[0],
+                     np.zeros(input_details["shape"], dtype=input_details["dtype"]))
+            self._interpreters[batch_size] = entry
+        return entry
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        count = batch.shape[0]
+        with self._lock:
+            padded = 1 << max(count - 1, 0).bit_length()
+            interpreter, input_details, output_details, buffer = self._interpreter_for(padded)
+            if input_details["dtype"] == np.int8:
+                scale, zero_point = input_details["quantization"]
+                buffer[:count] = np.clip(np.round(batch / scale + zero_point), -128, 127)
+            else:
+                buffer[:count] = batch
+            interpreter.set_tensor(input_details["index"], buffer)
+            interpreter.invoke()
+            result = interpreter.get_tensor(output_details["index"])[:count]
+        if output_details["dtype"] == np.int8:
+            scale, zero_point = output_details["quantization"]
+            result = (result.astype(np.float32) - zero_point) * scale
+        return result
+
+
+def load_backend(backend=settings.BACKEND, path=None, image_size=settings.IMAGE_SIZE,
+                 num_threads=settings.TFLITE_THREADS):
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    path = path or settings.backend_path(backend)
+    if backend == "keras":
+        return KerasBackend(path, image_size)
+    return TFLiteBackend(path, backend, num_threads)
@@ -0,0 +1,202 @@
+"""Bulk disease scan over a folder or ZIP of leaf photos.
+
+    python batch_scan.py field_walk.zip results.csv --batch-size 64 --top-k 3
+    python batch_scan.py photos/ results.jsonl --workers 8 --resume
+
+Images are streamed from the source, decoded and resized to 128x128 in a worker
+pool and fed to the model in fixed-size batches. Results are appended to the
+output file after every batch, so memory stays bounded by the batch size and an
+interrupted run picks up where it stopped with ``--resume``. Images that could
+not be decoded are written with their error and count as scanned, so
+``--resume`` does not retry them; start a fresh run to try them again.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from labels import CLASS_TABLE
+from model_registry import get_registry
+from preprocessing import load_array, new_batch
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def iter_source(source, skip=()):
+    """Yield ``(name, bytes)`` for every image in a directory tree or ZIP, in stable order.
+
+    Names in ``skip`` are passed over without reading their bytes.
+    """
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in sorted(archive.infolist(), key=lambda i: i.filename):
+                if info.is_dir() or info.filename in skip:
+                    continue
+                if os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS:
+                    yield info.filename, archive.read(info)
+        return
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, source)
+            if name in skip:
+                continue
+            with open(path, "rb") as f:
+                yield name, f.read()
+
+
+def _decoded(items, pool, window):
+    # Keep at most ``window`` images in flight so memory doesn't grow with the dataset
+    pending = deque()
+    for name, data in items:
+        pending.append((name, pool.submit(load_array, data)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def _results(pending, predictions, top_k):
+    # ``pending`` holds (name, error) in input order; only images without an error are in ``predictions``
+    predictions = iter(predictions)
+    for name, error in pending:
+        if error is not None:
+            yield {"path": name, "class_name": "", "top_k": [], "error": error}
+            continue
+        top = CLASS_TABLE.top_k(next(predictions), top_k)
+        yield {
+            "path": name,
+            "class_name": top[0][0].label,
+            "top_k": [[info.label, prob] for info, prob in top],
+            "error": "",
+        }
+
+
+def scan_items(items, batch_size=64, top_k=3, workers=None, processes=False, registry=None):
+    """Predict every ``(name, bytes)`` item, yielding one result dict per image in input order.
+
+    An image that fails to decode gets a result with its ``error`` set, in its
+    place among the others.
+    """
+    registry = registry or get_registry()
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    buffer = new_batch(batch_size)
+    pending = []
+    count = 0
+    with executor(max_workers=workers) as pool:
+        for name, future in _decoded(items, pool, window=2 * batch_size):
+            try:
+                np.copyto(buffer[count], future.result(), casting="unsafe")
+            except Exception as exc:
+                pending.append((name, str(exc)))
+                continue
+            pending.append((name, None))
+            count += 1
+            if count == batch_size:
+                yield from _results(pending, registry.predict(buffer), top_k)
+                pending, count = [], 0
+        if pending:
+            yield from _results(pending, registry.predict(buffer[:count]) if count else (), top_k)
+
+
+class ResultWriter:
+    """Appends results to a CSV or JSONL file, flushing as it goes."""
+
+    def __init__(self, path, top_k):
+        self.jsonl = path.endswith(".jsonl")
+        self.top_k = top_k
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        if not self.jsonl:
+            self._csv = csv.writer(self._file)
+            if is_new:
+                header = ["path", "class_name"]
+                for k in range(1, top_k + 1):
+                    header += [f"top{k}_class", f"top{k}_prob"]
+                self._csv.writerow(header + ["error"])
+
+    def write(self, result):
+        if self.jsonl:
+            self._file.write(json.dumps(result) + "\n")
+            return
+        row = [result["path"], result["class_name"]]
+        for k in range(self.top_k):
+            row += result["top_k"][k] if k < len(result["top_k"]) else ["", ""]
+        self._csv.writerow(row + [result["error"]])
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _drop_partial_line(path):
+    # A killed run can leave half a record behind; cut back to the last complete line
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        offset = max(size - 65536, 0)
+        f.seek(offset)
+        tail = f.read()
+        if tail and not tail.endswith(b"\n"):
+            f.truncate(offset + tail.rfind(b"\n") + 1)
+
+
+def completed_paths(path):
+    """Image names already present in an earlier (possibly interrupted) output file."""
+    if not os.path.exists(path):
+        return set()
+    _drop_partial_line(path)
+    done = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                done.add(json.loads(line)["path"])
+        else:
+            done.update(row["path"] for row in csv.DictReader(f) if row.get("path"))
+    return done
+
+
+def scan_to_file(source, output, batch_size=64, top_k=3, workers=None, processes=False, resume=False):
+    if not resume and os.path.exists(output):
+        os.remove(output)
+    done = completed_paths(output) if resume else set()
+    items = iter_source(source, skip=done)
+    writer = ResultWriter(output, top_k)
+    count = 0
+    try:
+        for count, result in enumerate(scan_items(items, batch_size, top_k, workers, processes), 1):
+            writer.write(result)
+            if count % batch_size == 0:
+                writer.flush()
+                print(f"\r{count} images scanned", end="", file=sys.stderr)
+    finally:
+        writer.close()
+    print(f"\r{count} images scanned, {len(done)} skipped from a previous run", file=sys.stderr)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="directory or .zip of leaf images")
+    parser.add_argument("output", help="results file, .csv or .jsonl")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="decode workers (default: CPU count)")
+    parser.add_argument("--processes", action="store_true", help="decode in a process pool instead of threads")
+    parser.add_argument("--resume", action="store_true", help="skip images already in the output file, including rows with an error")
+    args = parser.parse_args()
+    scan_to_file(args.source, args.output, args.batch_size, args.top_k, args.workers, args.processes, args.resume)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import settings
+from metrics import METRICS
+from model_registry import get_registry
+from preprocessing import new_batch
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Groups single-image requests from many sessions into shared forward passes.
+
+    Callers submit one preprocessed image and get a ``Future`` back. A single
+    worker thread drains the queue, waiting at most ``max_wait_ms`` after the
+    first request for up to ``max_batch_size`` images, runs them through the
+    registry's model in one call and resolves each future with its own row.
+    """
+
+    def __init__(self, registry=None, max_batch_size=settings.MAX_BATCH_SIZE, max_wait_ms=settings.MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.registry = registry or get_registry()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._buffer = new_batch(max_batch_size, self.registry.image_size)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        future = Future()
+        self._queue.put((np.asarray(image, dtype=np.float32), future, time.perf_counter()))
+        return future
+
+    def predict(self, image, timeout=None):
+        """Blocking helper: class probabilities for a single HxWx3 image."""
+        return self.submit(image).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            collected = self._collect(first)
+            started = time.perf_counter()
+            batch = []
+            for image, future, submitted in collected:
+                if future.set_running_or_notify_cancel():
+                    METRICS.observe("leaf_batcher_queue_wait_seconds", started - submitted,
+                                    help="Time from submit until the request's batch starts")
+                    batch.append((image, future))
+            if not batch:
+                continue
+            try:
+                inputs = np.stack([image for image, _ in batch], out=self._buffer[:len(batch)])
+                predictions = self.registry.predict(inputs)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for row, (_, future) in zip(predictions, batch):
+                future.set_result(row)
+
+
+def _collect_batcher(metrics):
+    metrics.set_gauge("leaf_batcher_queue_depth", _batcher.queue_depth(), help="Requests waiting for a batch")
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide batcher shared by every Streamlit session."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher()
+                METRICS.add_collector(_collect_batcher)
+    return _batcher
@@ -0,0 +1,79 @@
+"""Load-generation benchmark: batch-of-1 inference vs. the micro-batching engine.
+
+    python bench_batching.py --requests 2000 --concurrency 32 --max-batch-size 32 --max-wait-ms 5
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import settings
+from backends import BACKENDS
+from batching import MicroBatcher
+from model_registry import ModelRegistry
+
+
+def run_load(call, images, concurrency):
+    latencies = [None] * len(images)
+    next_index = iter(range(len(images)))
+    index_lock = threading.Lock()
+
+    def client():
+        while True:
+            with index_lock:
+                i = next(next_index, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            call(images[i])
+            latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, np.array(latencies) * 1000.0
+
+
+def report(name, elapsed, latencies_ms):
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    print(f"{name:<12} {len(latencies_ms) / elapsed:>10.1f} req/s   "
+          f"p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default=settings.BACKEND)
+    parser.add_argument("--model", default=None, help="model file (default: the backend's configured path)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=settings.MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.MAX_WAIT_MS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model, backend=args.backend)
+    loaded = registry.get()
+    print(f"model {loaded.path} ({loaded.version}) loaded in {loaded.load_seconds:.2f}s")
+
+    rng = np.random.default_rng(args.seed)
+    images = rng.uniform(0, 255, size=(args.requests, *settings.IMAGE_SIZE, 3)).astype(np.float32)
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients, CPU\n")
+
+    elapsed, latencies = run_load(lambda image: registry.predict(image[np.newaxis]), images, args.concurrency)
+    report("batch-of-1", elapsed, latencies)
+
+    batcher = MicroBatcher(registry, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    elapsed, latencies = run_load(batcher.predict, images, args.concurrency)
+    batcher.close()
+    report("batched", elapsed, latencies)
+    print(f"\nmean batch size {batcher.items / max(batcher.batches, 1):.1f} "
+          f"(max {args.max_batch_size}, wait {args.max_wait_ms} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Micro-benchmark: per-image decode+resize cost, current Keras path vs. preprocessing.py.
+
+    python bench_preprocessing.py --images 200 --source-size 256 1024
+
+The Keras path is what the Disease Recognition page used to do per Predict
+click: ``load_img`` for the preview, ``load_img`` again in ``model_prediction``,
+then ``img_to_array`` and ``np.array([...])``.
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+import settings
+from preprocessing import RESAMPLERS, new_batch, preprocess_into
+
+
+def synthetic_jpegs(count, side, seed):
+    rng = np.random.default_rng(seed)
+    # Smooth gradients plus noise compress like photos rather than like pure noise
+    base = np.linspace(0, 255, side, dtype=np.float32)
+    images = []
+    for _ in range(count):
+        pixels = (base[None, :, None] * rng.uniform(0.3, 1.0, 3) + rng.normal(0, 12, (side, side, 3)))
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def keras_path(data):
+    import tensorflow as tf
+    size = settings.IMAGE_SIZE
+    tf.keras.preprocessing.image.load_img(io.BytesIO(data), target_size=size)  # preview
+    image = tf.keras.preprocessing.image.load_img(io.BytesIO(data), target_size=size)
+    return np.array([tf.keras.preprocessing.image.img_to_array(image)])
+
+
+def time_per_image(fn, images):
+    fn(images[0])  # warm-up (lazy imports, allocator)
+    start = time.perf_counter()
+    for data in images:
+        fn(data)
+    return (time.perf_counter() - start) / len(images) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--source-size", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--skip-keras", action="store_true", help="don't import TensorFlow for the baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    batch = new_batch(1)
+    for side in args.source_size:
+        images = synthetic_jpegs(args.images, side, args.seed)
+        print(f"\n{args.images} JPEGs at {side}x{side} -> {settings.IMAGE_SIZE[0]}x{settings.IMAGE_SIZE[1]}")
+        if not args.skip_keras:
+            print(f"  {'keras load_img x2':<28} {time_per_image(keras_path, images):9.1f} us/image")
+        for name in RESAMPLERS:
+            for draft in (False, True):
+                label = f"{name}{' + jpeg draft' if draft else ''}"
+                cost = time_per_image(lambda data: preprocess_into(data, batch[0], name, draft), images)
+                print(f"  {label:<28} {cost:9.1f} us/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Reproducible end-to-end CPU benchmark across batch sizes and thread counts.
+
+    python bench_suite.py
+    python bench_suite.py --batch-sizes 1 8 32 64 --threads 1 2 4 --json bench.json
+    python bench_suite.py --baseline bench.json --tolerance 0.15    # exit 1 on regression
+
+Each run decodes synthetic 128x128 JPEGs into a batch buffer, runs the model
+and maps the outputs through the class table: the same hot path as the app.
+The trained model is used when present. Otherwise a seeded stand-in CNN with
+the same input and output shape is built, so the suite runs anywhere. Every
+thread count runs in a fresh process, because TensorFlow fixes its thread
+pools at start-up.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+import settings
+from backends import BACKENDS
+
+
+def build_standin_model(path, seed=0):
+    """Small randomly initialised CNN with the trained model's input and output shape."""
+    import tensorflow as tf
+    from labels import CLASS_TABLE
+    tf.keras.utils.set_random_seed(seed)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(*settings.IMAGE_SIZE, 3)),
+        tf.keras.layers.Rescaling(1 / 255.0),
+        tf.keras.layers.Conv2D(32, 3, padding="same", activation="relu"),
+        tf.keras.layers.MaxPooling2D(),
+        tf.keras.layers.Conv2D(64, 3, padding="same", activation="relu"),
+        tf.keras.layers.MaxPooling2D(),
+        tf.keras.layers.Conv2D(128, 3, padding="same", activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(len(CLASS_TABLE), activation="softmax"),
+    ])
+    model.save(path)
+
+
+def synthetic_jpegs(count, seed):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(*settings.IMAGE_SIZE, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def run_worker(args):
+    """One thread count, every batch size; prints a JSON list of results."""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(args.threads[0])
+    tf.config.threading.set_inter_op_parallelism_threads(args.threads[0])
+
+    from labels import CLASS_TABLE
+    from metrics import METRICS
+    from model_registry import ModelRegistry
+    from preprocessing import new_batch, preprocess_into
+
+    registry = ModelRegistry(args.model, backend=args.backend, num_threads=args.threads[0])
+    registry.get()
+    images = synthetic_jpegs(args.images, args.seed)
+    results = []
+    for batch_size in args.batch_sizes:
+        buffer = new_batch(batch_size)
+
+        def run_batch(start):
+            chunk = images[start:start + batch_size]
+            for i, data in enumerate(chunk):
+                preprocess_into(data, buffer[i])
+            for row in registry.predict(buffer[:len(chunk)]):
+                CLASS_TABLE.top_k(row, 3)
+
+        run_batch(0)  # warm-up
+        METRICS.reset()
+        latencies = []
+        start = time.perf_counter()
+        for offset in range(0, len(images), batch_size):
+            batch_start = time.perf_counter()
+            run_batch(offset)
+            latencies.append((time.perf_counter() - batch_start) * 1000.0)
+        elapsed = time.perf_counter() - start
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        results.append({
+            "threads": args.threads[0],
+            "batch_size": batch_size,
+            "throughput": len(images) / elapsed,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "stage_ms_per_image": {k: v * 1000.0 / len(images) for k, v in METRICS.stage_seconds().items()},
+        })
+    print(json.dumps(results))
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = {(r["threads"], r["batch_size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["threads"], r["batch_size"]))
+        if old and r["throughput"] < old["throughput"] * (1 - tolerance):
+            regressions.append(f"threads={r['threads']} batch={r['batch_size']}: "
+                               f"{r['throughput']:.1f} img/s vs baseline {old['throughput']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=BACKENDS, default=settings.BACKEND)
+    parser.add_argument("--model", default=None, help="model file (default: the backend's configured path)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--images", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--baseline", help="earlier --json output to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed throughput drop vs. baseline")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    model = args.model or settings.backend_path(args.backend)
+    standin = not os.path.exists(model)
+    tmpdir = tempfile.TemporaryDirectory()
+    if standin:
+        if args.backend != "keras":
+            raise SystemExit(f"{model} not found; run export_tflite.py first (stand-in is Keras only)")
+        model = os.path.join(tmpdir.name, "standin_model.keras")
+        subprocess.run([sys.executable, "-c", f"import bench_suite; bench_suite.build_standin_model({model!r}, {args.seed})"],
+                       check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    print(f"{'stand-in' if standin else 'trained'} model {model}, backend {args.backend}, "
+          f"{args.images} synthetic images, CPU")
+    print(f"{'threads':>7} {'batch':>6} {'img/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  stages (ms/image)")
+    results = []
+    for threads in args.threads:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--backend", args.backend,
+                   "--model", model, "--threads", str(threads), "--images", str(args.images),
+                   "--seed", str(args.seed), "--batch-sizes", *map(str, args.batch_sizes)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        for r in json.loads(output.strip().splitlines()[-1]):
+            stages = " ".join(f"{k}={v:.2f}" for k, v in sorted(r["stage_ms_per_image"].items()))
+            print(f"{r['threads']:>7} {r['batch_size']:>6} {r['throughput']:>9.1f} "
+                  f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}  {stages}")
+            results.append(r)
+    tmpdir.cleanup()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"backend": args.backend, "standin": standin, "images": args.images,
+                       "seed": args.seed, "results": results}, f, indent=2)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Export the trained Keras model to TFLite float16 and int8 for the TFLite backends.
+
+    python export_tflite.py --calibration calibration_images/ --samples 200
+
+The int8 variant uses full-integer post-training quantization, calibrated on a
+random sample of leaf photos from a directory or ZIP. Outputs go to the paths
+the ``tflite-float`` and ``tflite-int8`` backends load by default.
+"""
+import argparse
+import random
+
+import numpy as np
+import tensorflow as tf
+
+import settings
+from batch_scan import iter_source
+from preprocessing import load_array
+
+
+def sample_images(source, count, seed):
+    """Reservoir sample of ``count`` decoded images, streamed from ``source``."""
+    rng = random.Random(seed)
+    reservoir = []
+    for seen, (_, data) in enumerate(iter_source(source)):
+        if len(reservoir) < count:
+            reservoir.append(data)
+        else:
+            slot = rng.randint(0, seen)
+            if slot < count:
+                reservoir[slot] = data
+    if not reservoir:
+        raise SystemExit(f"no images found in {source}")
+    return [load_array(data).astype(np.float32) for data in reservoir]
+
+
+def export_float16(model, path):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def export_int8(model, path, calibration):
+    def representative_dataset():
+        for image in calibration:
+            yield [image[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.MODEL_PATH)
+    parser.add_argument("--calibration", required=True, help="directory or .zip of representative leaf images")
+    parser.add_argument("--samples", type=int, default=200, help="calibration images to use for int8")
+    parser.add_argument("--float16-out", default=settings.TFLITE_PATHS["tflite-float"])
+    parser.add_argument("--int8-out", default=settings.TFLITE_PATHS["tflite-int8"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    export_float16(model, args.float16_out)
+    print(f"wrote {args.float16_out}")
+    calibration = sample_images(args.calibration, args.samples, args.seed)
+    export_int8(model, args.int8_out, calibration)
+    print(f"wrote {args.int8_out} (calibrated on {len(calibration)} images)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from batching import get_batcher
+from metrics import METRICS
+from model_registry import get_registry
+from prediction_cache import cache_key, get_prediction_cache
+
+
+def predict(image_digest, decode, registry=None, batcher=None, cache=None):
+    """Class probabilities for the image with content digest ``image_digest``.
+
+    Shared by the Streamlit page and the API: repeat images (same content
+    digest under the same model version) are answered from the prediction
+    cache without being decoded; on a miss ``decode()`` is called for the
+    preprocessed HxWx3 image, which is batched with concurrent requests.
+    ``registry``, ``batcher`` and ``cache`` default to the process-wide ones.
+    """
+    registry = registry or get_registry()
+    batcher = batcher or get_batcher()
+    cache = cache or get_prediction_cache()
+    key = cache_key(image_digest, registry.get().version)
+    with METRICS.stage("cache_lookup"):
+        predictions = cache.get(key)
+    if predictions is None:
+        image = decode()
+        with METRICS.stage("batched_inference"):
+            predictions = batcher.predict(image)
+        cache.put(key, predictions)
+    return predictions
@@ -0,0 +1,75 @@
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+import settings
+
+
+@dataclass(frozen=True)
+class ClassInfo:
+    index: int
+    label: str
+    advice: str
+
+
+class ClassTable:
+    """Model output index -> label and advice, loaded once from ``classes.json``.
+
+    ``model_outputs`` and the optional ``model_versions`` allowlist bind the
+    table to the model it describes; ``check_model`` rejects a model whose
+    output layer or version doesn't match, before it starts serving.
+
+    The shipped ``classes.json`` leaves ``model_versions`` empty, so only the
+    output count is checked and a retrained model with the same number of
+    classes in a different order loads unnoticed. To bind the table to
+    specific files, list the ``version`` of every model file that may serve
+    it (``model_registry.file_version(path)``, also shown under Model Status
+    in the sidebar), including each TFLite export, since each file hashes
+    differently.
+    """
+
+    def __init__(self, version, classes, model_outputs, model_versions=()):
+        if len(classes) != model_outputs:
+            raise ValueError(f"class table v{version} lists {len(classes)} classes but declares {model_outputs}")
+        self.version = version
+        self.classes = tuple(ClassInfo(i, c["label"], c.get("advice", "")) for i, c in enumerate(classes))
+        self.labels = tuple(c.label for c in self.classes)
+        self.model_versions = frozenset(model_versions)
+        self._by_label = {c.label: c for c in self.classes}
+        if len(self._by_label) != len(self.classes):
+            raise ValueError(f"class table v{version} has duplicate labels")
+
+    @classmethod
+    def load(cls, path=settings.CLASSES_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["version"], data["classes"], data["model_outputs"], data.get("model_versions", ()))
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __getitem__(self, index):
+        return self.classes[index]
+
+    def by_label(self, label):
+        return self._by_label.get(label)
+
+    def check_model(self, num_outputs, model_version):
+        if num_outputs != len(self.classes):
+            raise ValueError(
+                f"model {model_version} has {num_outputs} outputs but class table v{self.version} has {len(self.classes)}"
+            )
+        if self.model_versions and model_version not in self.model_versions:
+            raise ValueError(f"model {model_version} is not listed in class table v{self.version}")
+
+    def top_k(self, probs, k=3):
+        """``(ClassInfo, probability)`` pairs for the ``k`` most likely classes."""
+        probs = np.asarray(probs).ravel()
+        k = min(k, len(probs))
+        top = np.argpartition(probs, -k)[-k:]
+        top = top[np.argsort(probs[top])[::-1]]
+        return [(self.classes[i], float(probs[i])) for i in top]
+
+
+CLASS_TABLE = ClassTable.load()
@@ -0,0 +1,126 @@
+"""Concurrent load test for api_server.py.
+
+    python load_test_api.py --url http://127.0.0.1:8600 --requests 2000 --concurrency 64
+    python load_test_api.py --in-process --requests 500      # starts the app in this process
+
+Reports throughput, latency percentiles and the status-code mix, so 429
+backpressure under overload is visible next to the successful requests.
+Synthetic images are distinct per request by default, so the server's
+prediction cache doesn't turn the run into a cache benchmark; lower
+``--distinct`` to measure a warm cache instead.
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+import tornado.httpclient
+from PIL import Image
+
+import settings
+
+
+def synthetic_jpeg(seed):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(256, 256, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def multipart(field, images):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for i, data in enumerate(images):
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="leaf{i}.jpg"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode() + data + b"\r\n"
+        )
+    return b"".join(parts) + f"--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+async def run_load(url, payloads, requests, concurrency):
+    client = tornado.httpclient.AsyncHTTPClient(max_clients=concurrency)
+    statuses = Counter()
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            body, content_type = payloads[i % len(payloads)]
+            start = time.perf_counter()
+            response = await client.fetch(url, method="POST", body=body, raise_error=False,
+                                          headers={"Content-Type": content_type}, request_timeout=120)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            statuses[response.code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, np.array(latencies), statuses
+
+
+async def main_async(args):
+    base_url = args.url
+    if args.in_process:
+        import tornado.httpserver
+        import tornado.netutil
+        from api_server import PredictionService, make_app
+        service = PredictionService()
+        service.registry.load_in_background()
+        sockets = tornado.netutil.bind_sockets(0, "127.0.0.1")
+        server = tornado.httpserver.HTTPServer(make_app(service), max_body_size=settings.API_MAX_BODY_BYTES + 2**20)
+        server.add_sockets(sockets)
+        base_url = f"http://127.0.0.1:{sockets[0].getsockname()[1]}"
+
+    client = tornado.httpclient.AsyncHTTPClient()
+    while True:
+        response = await client.fetch(f"{base_url}/readyz", raise_error=False)
+        if response.code == 200:
+            break
+        ready = json.loads(response.body or b"{}")
+        if ready.get("status") == "error":
+            raise SystemExit(f"model failed to load: {ready.get('error')}")
+        await asyncio.sleep(0.5)
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            images = [f.read()]
+    else:
+        images = [synthetic_jpeg(args.seed + i) for i in range(args.distinct or args.requests * args.batch)]
+    if args.batch > 1:
+        url = f"{base_url}/v1/predict/batch"
+        payloads = [multipart("images", [images[(i * args.batch + j) % len(images)] for j in range(args.batch)])
+                    for i in range(args.requests)]
+    else:
+        url = f"{base_url}/v1/predict"
+        payloads = [(image, "image/jpeg") for image in images]
+
+    elapsed, latencies, statuses = await run_load(url, payloads, args.requests, args.concurrency)
+    ok = statuses.get(200, 0)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{args.requests} requests x {args.batch} image(s), {args.concurrency} concurrent -> {url}")
+    print(f"throughput {ok * args.batch / elapsed:.1f} img/s ({args.requests / elapsed:.1f} req/s)")
+    print(f"latency    p50 {p50:.1f} ms   p95 {p95:.1f} ms   p99 {p99:.1f} ms")
+    print("statuses   " + "   ".join(f"{code}: {count}" for code, count in sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"http://127.0.0.1:{settings.API_PORT}")
+    parser.add_argument("--in-process", action="store_true", help="serve make_app() from this process")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=1, help="images per request (>1 uses /v1/predict/batch)")
+    parser.add_argument("--image", help="leaf photo to send (default: synthetic JPEGs)")
+    parser.add_argument("--distinct", type=int, default=0, help="distinct synthetic images (default: one per image sent)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Hot-path instrumentation: per-stage timings, batch sizes, queue depth and memory.
+
+Stages are recorded into Prometheus histograms (``render_prometheus``) and,
+inside a ``trace``, collected per request and logged as one JSON line on the
+``leaf.metrics`` logger. ``tf_profiler`` wraps inference calls in a TensorFlow
+profiler trace when LEAF_TF_PROFILE_DIR is set.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+logger = logging.getLogger("leaf.metrics")
+if settings.METRICS_LOG and not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Process-wide metric store; every method is safe to call from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = []
+        self._local = threading.local()
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = (Histogram(buckets), help)
+            histogram[0].observe(value)
+
+    def inc(self, name, amount=1, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            value, _ = self._counters.get(key, (0, help))
+            self._counters[key] = (value + amount, help)
+
+    def set_gauge(self, name, value, help="", **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = (value, help)
+
+    def add_collector(self, collect):
+        """Register ``collect()`` to refresh gauges right before each export."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def remove_collector(self, collect):
+        with self._lock:
+            if collect in self._collectors:
+                self._collectors.remove(collect)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe("leaf_stage_seconds", seconds, help="Time spent per hot-path stage", stage=name)
+            stages = getattr(self._local, "stages", None)
+            if stages is not None:
+                stages[name] = stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def trace(self, event, **fields):
+        """Collect the stages run by this thread into one structured log line for ``event``."""
+        outer = getattr(self._local, "stages", None)
+        self._local.stages = stages = {}
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self._local.stages = outer
+            total = time.perf_counter() - start
+            self.observe("leaf_request_seconds", total, help="End-to-end request time", event=event)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({
+                    "event": event,
+                    "total_ms": round(total * 1000.0, 3),
+                    "stages_ms": {k: round(v * 1000.0, 3) for k, v in stages.items()},
+                    **fields,
+                }))
+
+    def stage_seconds(self):
+        """Total seconds recorded per stage so far, e.g. for a benchmark's per-stage breakdown."""
+        with self._lock:
+            return {dict(labels)["stage"]: histogram.sum
+                    for (name, labels), (histogram, _) in self._histograms.items() if name == "leaf_stage_seconds"}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def render_prometheus(self):
+        for collect in list(self._collectors):
+            collect(self)
+        lines = []
+        with self._lock:
+            families = {}
+            for (name, labels), (value, help) in self._counters.items():
+                families.setdefault((name, "counter", help), []).append((labels, value))
+            for (name, labels), (value, help) in self._gauges.items():
+                families.setdefault((name, "gauge", help), []).append((labels, value))
+            for (name, labels), (histogram, help) in self._histograms.items():
+                families.setdefault((name, "histogram", help), []).append((labels, histogram))
+            for (name, kind, help), samples in sorted(families.items()):
+                if help:
+                    lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if kind != "histogram":
+                        lines.append(f"{name}{_labels(labels)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip((*value.buckets, "+Inf"), value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+METRICS = Metrics()
+
+
+def _collect_process(metrics):
+    from model_registry import process_rss_bytes
+    metrics.set_gauge("leaf_process_resident_memory_bytes", process_rss_bytes(), help="Process RSS")
+
+
+METRICS.add_collector(_collect_process)
+
+
+class _TFProfiler:
+    """Profiles the first ``batches`` inference calls into ``logdir`` (TensorBoard format)."""
+
+    def __init__(self, logdir, batches):
+        self.logdir = logdir
+        self.remaining = batches
+        self._lock = threading.Lock()
+        self._running = False
+
+    @contextmanager
+    def __call__(self):
+        if not self.logdir or self.remaining <= 0:
+            yield
+            return
+        import tensorflow as tf
+        with self._lock:
+            if not self._running and self.remaining > 0:
+                tf.profiler.experimental.start(self.logdir)
+                self._running = True
+        try:
+            with tf.profiler.experimental.Trace("inference"):
+                yield
+        finally:
+            with self._lock:
+                self.remaining -= 1
+                if self._running and self.remaining <= 0:
+                    tf.profiler.experimental.stop()
+                    self._running = False
+
+
+tf_profiler = _TFProfiler(settings.TF_PROFILE_DIR, settings.TF_PROFILE_BATCHES)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter = None
+_exporter_error = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port=settings.METRICS_PORT):
+    """Serve /metrics on ``port`` from a daemon thread, once per process (no-op without a port).
+
+    If the port can't be bound the error is logged once and the exporter
+    stays off; the app keeps running and later calls don't retry.
+    """
+    global _exporter, _exporter_error
+    if port is None:
+        return None
+    with _exporter_lock:
+        if _exporter is None and _exporter_error is None:
+            try:
+                _exporter = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as exc:
+                _exporter_error = exc
+                logger.warning("metrics exporter disabled, cannot listen on port %s: %s", port, exc)
+                return None
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+    return _exporter
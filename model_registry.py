@@ -0,0 +1,272 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+import settings
+from backends import load_backend
+from labels import CLASS_TABLE
+from metrics import BATCH_BUCKETS, METRICS, tf_profiler
+from startup_profile import PROFILE
+
+
+def file_version(path):
+    """Short content hash of a model file, used as its version tag."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def process_rss_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelLoadError(RuntimeError):
+    """The model file failed to load; raised by every ``get()`` until the file on disk changes."""
+
+
+@dataclass
+class LoadedModel:
+    backend: object
+    path: str
+    version: str
+    mtime: float
+    load_seconds: float
+    warmup_seconds: float
+    weight_bytes: int
+    rss_delta_bytes: int
+
+
+class ModelRegistry:
+    """Loads the configured backend once per process and shares it between sessions.
+
+    The active model is replaced atomically on reload, so requests already
+    holding the previous ``LoadedModel`` finish on it undisturbed. ``_lock`` is
+    held for the whole of the first load; ``_state_lock`` only ever guards quick
+    bookkeeping, so status checks never wait on a load in progress. A failed
+    load is remembered together with the file's mtime and not retried until
+    the file is replaced.
+    """
+
+    settle_seconds = 2.0
+
+    def __init__(self, path=None, image_size=settings.IMAGE_SIZE, backend=settings.BACKEND,
+                 num_threads=settings.TFLITE_THREADS):
+        self.backend = backend
+        self.path = path or settings.backend_path(backend)
+        self.image_size = image_size
+        self.num_threads = num_threads
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._current = None
+        self._loader = None
+        self.load_error = None
+        self._failed_mtime = None
+        self.reload_error = None
+        self._reload_failed_mtime = None
+        self.loads = 0
+        self.predictions = 0
+
+    def _load(self, path):
+        with PROFILE.phase("import tensorflow"):
+            import tensorflow  # noqa: F401 - timed on its own, separately from the model load
+        rss_before = process_rss_bytes()
+        start = time.perf_counter()
+        backend = load_backend(self.backend, path, self.image_size, self.num_threads)
+        load_seconds = time.perf_counter() - start
+        version = file_version(path)
+        # Refuse a model whose outputs don't line up with the labels before it serves anything
+        CLASS_TABLE.check_model(backend.num_outputs, version)
+
+        # A dummy forward pass builds the graph so the first real request doesn't pay for it
+        start = time.perf_counter()
+        backend.predict(np.zeros((1, *self.image_size, 3), dtype=np.float32))
+        warmup_seconds = time.perf_counter() - start
+        PROFILE.record("load model", load_seconds)
+        PROFILE.record("warm-up", warmup_seconds)
+
+        return LoadedModel(
+            backend=backend,
+            path=path,
+            version=version,
+            mtime=os.path.getmtime(path),
+            load_seconds=load_seconds,
+            warmup_seconds=warmup_seconds,
+            weight_bytes=backend.weight_bytes,
+            rss_delta_bytes=process_rss_bytes() - rss_before,
+        )
+
+    def _failed_unchanged(self):
+        return self.load_error is not None and file_mtime(self.path) == self._failed_mtime
+
+    def get(self):
+        current = self._current
+        if current is not None:
+            return current
+        with self._lock:
+            if self._current is None:
+                if self._failed_unchanged():
+                    raise ModelLoadError(f"model {self.path} failed to load: {self.load_error}") from self.load_error
+                mtime = file_mtime(self.path)
+                try:
+                    loaded = self._load(self.path)
+                except Exception as exc:
+                    with self._state_lock:
+                        self.load_error = exc
+                        self._failed_mtime = mtime
+                    raise ModelLoadError(f"model {self.path} failed to load: {exc}") from exc
+                with self._state_lock:
+                    self._current = loaded
+                    self.load_error = None
+                    self.loads += 1
+            return self._current
+
+    @property
+    def ready(self):
+        return self._current is not None
+
+    @property
+    def status(self):
+        """``ready``, ``loading``, ``error`` or ``idle``; never waits on a load."""
+        if self._current is not None:
+            return "ready"
+        if self._loader is not None:
+            return "loading"
+        return "error" if self.load_error is not None else "idle"
+
+    def load_in_background(self):
+        """Start loading on a daemon thread and return at once, so the UI can render meanwhile."""
+        with self._state_lock:
+            if self._current is not None or self._loader is not None or self._failed_unchanged():
+                return
+            self._loader = threading.Thread(target=self._background_load, name="model-loader", daemon=True)
+            self._loader.start()
+
+    def _background_load(self):
+        try:
+            self.get()
+        except Exception:
+            pass  # recorded in load_error by get()
+        finally:
+            with self._state_lock:
+                self._loader = None
+
+    def reload(self, path=None):
+        """Load ``path`` (default: the current path) and swap it in without a restart."""
+        path = path or self.path
+        loaded = self._load(path)
+        with self._state_lock:
+            self._current = loaded
+            self.path = path
+            self.loads += 1
+        return loaded
+
+    def refresh_if_changed(self):
+        """Start a background hot swap when the model file has been replaced on disk.
+
+        Returns True only when a swap was started. The file must have been
+        left alone for ``settle_seconds`` so a copy in progress isn't loaded,
+        and a file version that already failed to swap isn't tried again.
+        """
+        current = self._current
+        if current is None:
+            return False
+        mtime = file_mtime(self.path)
+        if mtime is None or mtime == current.mtime or mtime == self._reload_failed_mtime:
+            return False
+        if time.time() - mtime < self.settle_seconds:
+            return False
+        # Another session is already swapping the model in
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._background_reload, args=(mtime,), name="model-reloader", daemon=True).start()
+        return True
+
+    def _background_reload(self, mtime):
+        try:
+            self.reload()
+        except Exception as exc:
+            # Keep serving the current model; this file version is not retried
+            with self._state_lock:
+                self.reload_error = exc
+                self._reload_failed_mtime = mtime
+        else:
+            self.reload_error = None
+        finally:
+            self._reload_lock.release()
+
+    def predict(self, batch):
+        backend = self.get().backend
+        with METRICS.stage("inference"), tf_profiler():
+            predictions = backend.predict(batch)
+        METRICS.observe("leaf_inference_batch_size", len(batch), buckets=BATCH_BUCKETS,
+                        help="Images per forward pass", backend=self.backend)
+        with self._state_lock:
+            self.predictions += len(batch)
+        return predictions
+
+    def stats(self):
+        current = self._current
+        stats = {
+            "backend": self.backend,
+            "status": self.status,
+            "loaded": current is not None,
+            "load_error": str(self.load_error) if self.load_error is not None else None,
+            "reload_error": str(self.reload_error) if self.reload_error is not None else None,
+            "loads": self.loads,
+            "predictions": self.predictions,
+            "process_rss_mb": process_rss_bytes() / 2**20,
+        }
+        if current is not None:
+            stats.update(
+                path=current.path,
+                version=current.version,
+                load_seconds=current.load_seconds,
+                warmup_seconds=current.warmup_seconds,
+                weights_mb=current.weight_bytes / 2**20,
+                load_rss_delta_mb=current.rss_delta_bytes / 2**20,
+            )
+        return stats
+
+
+def _collect_registry(metrics):
+    stats = _registry.stats()
+    metrics.set_gauge("leaf_model_loaded", int(stats["loaded"]), help="1 once the model is serving")
+    metrics.set_gauge("leaf_model_loads", stats["loads"], help="Model loads and hot swaps in this process")
+    metrics.set_gauge("leaf_model_predictions", stats["predictions"], help="Images run through the model")
+    if stats["loaded"]:
+        metrics.set_gauge("leaf_model_load_seconds", stats["load_seconds"], help="Time to load the active model")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry shared by every Streamlit session and rerun."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+                METRICS.add_collector(_collect_registry)
+    return _registry
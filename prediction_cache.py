@@ -0,0 +1,162 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import settings
+from metrics import METRICS
+
+
+def content_digest(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def cache_key(image_digest, model_version):
+    """Content address of an upload (see ``content_digest``) under a given model version."""
+    return f"{image_digest}:{model_version}"
+
+
+class PredictionCache:
+    """Two-tier cache of class-probability vectors keyed by ``cache_key``.
+
+    The memory tier is an LRU bounded by ``max_entries`` and ``ttl_seconds``.
+    When ``db_path`` is set, entries are also written to SQLite so they survive
+    restarts; a disk hit is promoted back into memory. SQLite is only touched
+    under ``_db_lock``, never while holding the memory-tier ``_lock``, and the
+    table is pruned once it has grown ``db_slack`` rows past its limit rather
+    than counted on every insert.
+    """
+
+    def __init__(self, max_entries=settings.CACHE_MAX_ENTRIES, ttl_seconds=settings.CACHE_TTL_SECONDS,
+                 db_path=settings.CACHE_DB_PATH, db_max_entries=settings.CACHE_DB_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_max_entries = db_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._db = None
+        self._db_rows = 0
+        self.db_slack = max(1, db_max_entries // 10)
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, probs BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._db_rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def _expired(self, created, now):
+        return self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def _remember(self, key, probs, created):
+        self._entries[key] = (probs, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self.expirations += 1
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT probs, created FROM predictions WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is not None and not self._expired(row[1], now):
+                probs = np.frombuffer(row[0], dtype=np.float32)
+                self._remember(key, probs, row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return probs
+            self.misses += 1
+            return None
+
+    def put(self, key, probs):
+        # A copy, so an entry never pins the whole batch output it was sliced from
+        probs = np.array(probs, dtype=np.float32).ravel()
+        probs.setflags(write=False)
+        created = time.time()
+        with self._lock:
+            self._remember(key, probs, created)
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO predictions (key, probs, created) VALUES (?, ?, ?)",
+                (key, probs.tobytes(), created),
+            )
+            # Counts a replaced key as a new row; the prune below recounts exactly
+            self._db_rows += 1
+            if self._db_rows > self.db_max_entries + self.db_slack:
+                self._prune_db(created)
+            self._db.commit()
+
+    def _prune_db(self, now):
+        if self.ttl_seconds > 0:
+            self._db.execute("DELETE FROM predictions WHERE created < ?", (now - self.ttl_seconds,))
+        rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        overflow = rows - self.db_max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY created LIMIT ?)",
+                (overflow,),
+            )
+            rows -= overflow
+            with self._lock:
+                self.evictions += overflow
+        self._db_rows = rows
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_tier": self._db is not None,
+            }
+
+
+def _collect_cache(metrics):
+    for name, value in _cache.stats().items():
+        if name not in ("disk_tier", "max_entries"):
+            metrics.set_gauge(f"leaf_prediction_cache_{name}", value, help="Prediction cache statistics")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """Process-wide prediction cache shared by every Streamlit session."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+                METRICS.add_collector(_collect_cache)
+    return _cache
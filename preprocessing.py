@@ -0,0 +1,82 @@
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+import settings
+from metrics import METRICS
+
+RESAMPLERS = {
+    "nearest": Image.NEAREST,
+    "box": Image.BOX,
+    "bilinear": Image.BILINEAR,
+    "hamming": Image.HAMMING,
+    "bicubic": Image.BICUBIC,
+    "lanczos": Image.LANCZOS,
+}
+
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    if isinstance(source, (str, os.PathLike)) or hasattr(source, "read"):
+        return Image.open(source)
+    if isinstance(source, np.ndarray):
+        if source.dtype != np.uint8:
+            source = np.clip(source, 0, 255).astype(np.uint8)
+        return Image.fromarray(source)
+    raise TypeError(f"unsupported image source: {type(source).__name__}")
+
+
+def load_image(source, size=settings.IMAGE_SIZE, resample=settings.RESAMPLE, draft=settings.JPEG_DRAFT):
+    """Decode ``source`` (bytes, path, file object or array) once into an RGB image.
+
+    ``size`` is (height, width), as in ``tf.keras`` ``target_size``.
+
+    With ``draft`` the JPEG decoder skips straight to the smallest DCT scale that
+    is still at least ``size``, which is much cheaper for large photos.
+
+    Images over ``settings.MAX_IMAGE_PIXELS`` are refused with ValueError from
+    their header alone, before any pixel data is decoded.
+    """
+    width_height = (size[1], size[0])
+    with _open(source) as image:
+        if image.width * image.height > settings.MAX_IMAGE_PIXELS:
+            raise ValueError(f"image is {image.width}x{image.height}, "
+                             f"over the {settings.MAX_IMAGE_PIXELS}-pixel limit")
+        if draft and image.format == "JPEG":
+            image.draft("RGB", width_height)
+        image = image.convert("RGB")
+    if image.size != width_height:
+        image = image.resize(width_height, RESAMPLERS[resample])
+    return image
+
+
+def load_array(source, size=settings.IMAGE_SIZE, resample=settings.RESAMPLE, draft=settings.JPEG_DRAFT):
+    """Decoded image as a uint8 HxWx3 array, a quarter the size of its float32 form."""
+    if isinstance(source, np.ndarray) and source.shape == (*size, 3) and source.dtype == np.uint8:
+        return source
+    return np.asarray(load_image(source, size, resample, draft))
+
+
+def preprocess_into(source, out, resample=settings.RESAMPLE, draft=settings.JPEG_DRAFT):
+    """Decode ``source`` straight into ``out``, one HxWx3 float32 slot of a preallocated batch.
+
+    Returns the resized image so callers can reuse it (e.g. for a preview)
+    instead of decoding the upload a second time.
+    """
+    size = out.shape[:2]
+    if isinstance(source, np.ndarray) and source.shape == out.shape:
+        with METRICS.stage("to_array"):
+            np.copyto(out, source, casting="unsafe")
+        return None
+    with METRICS.stage("decode"):
+        image = load_image(source, size, resample, draft)
+    with METRICS.stage("to_array"):
+        np.copyto(out, np.asarray(image), casting="unsafe")
+    return image
+
+
+def new_batch(capacity, size=settings.IMAGE_SIZE):
+    return np.empty((capacity, *size, 3), dtype=np.float32)
@@ -0,0 +1,66 @@
+import os
+
+# Runtime configuration, overridable through environment variables so the
+# Streamlit app, CLI tools and benchmarks all agree on the same defaults.
+
+MODEL_PATH = os.environ.get("LEAF_MODEL_PATH", "trained_plant_disease_model.keras")
+IMAGE_SIZE = (128, 128)
+
+# Micro-batching: concurrent requests are grouped into one forward pass of up to
+# MAX_BATCH_SIZE images, waiting at most MAX_WAIT_MS for the batch to fill.
+MAX_BATCH_SIZE = int(os.environ.get("LEAF_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.environ.get("LEAF_MAX_WAIT_MS", "5"))
+
+# Prediction cache: in-memory LRU bounded by entry count and age, plus an optional
+# SQLite tier (enabled by setting LEAF_CACHE_DB) that survives restarts.
+CACHE_MAX_ENTRIES = int(os.environ.get("LEAF_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.environ.get("LEAF_CACHE_TTL_SECONDS", "3600"))
+CACHE_DB_PATH = os.environ.get("LEAF_CACHE_DB", "")
+CACHE_DB_MAX_ENTRIES = int(os.environ.get("LEAF_CACHE_DB_MAX_ENTRIES", "100000"))
+
+# Preprocessing: resampling filter used to resize uploads to IMAGE_SIZE (nearest
+# matches tf.keras load_img, which the model was trained with), whether JPEGs
+# may be decoded at reduced scale before resizing, and the largest image (in
+# pixels) that is decoded at all.
+RESAMPLE = os.environ.get("LEAF_RESAMPLE", "nearest")
+JPEG_DRAFT = os.environ.get("LEAF_JPEG_DRAFT", "0") == "1"
+MAX_IMAGE_PIXELS = int(os.environ.get("LEAF_MAX_IMAGE_PIXELS", str(50_000_000)))
+
+# Inference backend: "keras" runs MODEL_PATH; "tflite-float" and "tflite-int8" run
+# the files written by export_tflite.py with TFLITE_THREADS interpreter threads
+# (unset lets TFLite decide).
+BACKEND = os.environ.get("LEAF_BACKEND", "keras")
+TFLITE_PATHS = {
+    "tflite-float": os.environ.get("LEAF_TFLITE_FLOAT_PATH", "trained_plant_disease_model_float16.tflite"),
+    "tflite-int8": os.environ.get("LEAF_TFLITE_INT8_PATH", "trained_plant_disease_model_int8.tflite"),
+}
+TFLITE_THREADS = int(os.environ["LEAF_TFLITE_THREADS"]) if os.environ.get("LEAF_TFLITE_THREADS") else None
+
+
+def backend_path(backend):
+    return MODEL_PATH if backend == "keras" else TFLITE_PATHS[backend]
+
+# Startup profiling: record per-phase import/load timings and time to first
+# prediction, shown in the sidebar and logged to stderr.
+PROFILE_STARTUP = os.environ.get("LEAF_PROFILE_STARTUP", "0") == "1"
+
+# Class table: output index -> label and advice, bound to the model it describes.
+CLASSES_PATH = os.environ.get("LEAF_CLASSES_PATH", "classes.json")
+
+# Headless prediction API (api_server.py): at most API_MAX_QUEUE images may be
+# queued or in flight before new requests are rejected with 429.
+API_HOST = os.environ.get("LEAF_API_HOST", "0.0.0.0")
+API_PORT = int(os.environ.get("LEAF_API_PORT", "8600"))
+API_WORKERS = int(os.environ.get("LEAF_API_WORKERS", "8"))
+API_MAX_QUEUE = int(os.environ.get("LEAF_API_MAX_QUEUE", "64"))
+API_MAX_BODY_BYTES = int(os.environ.get("LEAF_API_MAX_BODY_BYTES", str(10 * 2**20)))
+API_MAX_IMAGES = int(os.environ.get("LEAF_API_MAX_IMAGES", "32"))
+
+# Observability: LEAF_METRICS_LOG=1 writes one JSON line per request with its stage
+# timings to stderr; LEAF_METRICS_PORT serves Prometheus /metrics from the Streamlit
+# process; LEAF_TF_PROFILE_DIR captures a TensorFlow profiler trace of the first
+# TF_PROFILE_BATCHES inference calls.
+METRICS_LOG = os.environ.get("LEAF_METRICS_LOG", "0") == "1"
+METRICS_PORT = int(os.environ["LEAF_METRICS_PORT"]) if os.environ.get("LEAF_METRICS_PORT") else None
+TF_PROFILE_DIR = os.environ.get("LEAF_TF_PROFILE_DIR", "")
+TF_PROFILE_BATCHES = int(os.environ.get("LEAF_TF_PROFILE_BATCHES", "20"))
@@ -0,0 +1,104 @@
+"""Cold-start profile: per-phase timings from process start to first prediction.
+
+    LEAF_PROFILE_STARTUP=1 streamlit run main.py     # sidebar table + stderr log
+    python startup_profile.py [--image leaf.jpg]     # headless cold start, printed report
+
+Phases are recorded once per process; later reruns of the Streamlit script
+don't overwrite the cold-start numbers.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import settings
+
+
+def _process_age():
+    # Seconds since the interpreter was exec'd, so the report includes Python and Streamlit startup
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+_START = time.perf_counter() - _process_age()
+
+
+class StartupProfile:
+    def __init__(self, enabled=settings.PROFILE_STARTUP):
+        self.enabled = enabled
+        self.phases = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds=None):
+        """Record phase ``name`` (``seconds`` long, or just a point in time) the first time it happens."""
+        with self._lock:
+            if name in self._seen:
+                return
+            self._seen.add(name)
+            since_start = time.perf_counter() - _START
+            self.phases.append({"phase": name, "seconds": seconds, "since_start": since_start})
+        if self.enabled:
+            took = f"{seconds:.3f}s" if seconds is not None else "-"
+            print(f"[startup] {name:<24} {took:>9}   at {since_start:.3f}s", file=sys.stderr)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self):
+        with self._lock:
+            return list(self.phases)
+
+    def format(self):
+        lines = [f"{'phase':<24} {'took':>9} {'at':>9}"]
+        for p in self.report():
+            took = f"{p['seconds']:.3f}s" if p["seconds"] is not None else "-"
+            lines.append(f"{p['phase']:<24} {took:>9} {p['since_start']:>8.3f}s")
+        return "\n".join(lines)
+
+
+PROFILE = StartupProfile()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="leaf photo for the first prediction (default: a blank image)")
+    args = parser.parse_args()
+
+    # Run as a script this module is __main__; share the instance the app modules record into
+    import startup_profile
+    profile = startup_profile.PROFILE
+    profile.record("interpreter ready")
+    with profile.phase("import numpy"):
+        import numpy as np
+    with profile.phase("import app modules"):
+        from batching import get_batcher
+        from model_registry import get_registry
+        from preprocessing import new_batch, preprocess_into
+
+    get_registry().get()
+    batch = new_batch(1)
+    with profile.phase("first prediction"):
+        if args.image:
+            preprocess_into(args.image, batch[0])
+        else:
+            batch.fill(0)
+        np.argmax(get_batcher().predict(batch[0]))
+    print(profile.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import io
+import json
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+from tornado.testing import AsyncHTTPTestCase
+
+import settings
+from api_server import PredictionService, make_app
+from labels import CLASS_TABLE
+from metrics import METRICS
+from model_registry import ModelLoadError
+from prediction_cache import PredictionCache
+
+PREDICTED = 3
+
+
+class StubRegistry:
+    """Stands in for ModelRegistry: always answers class PREDICTED, no TensorFlow needed."""
+
+    image_size = settings.IMAGE_SIZE
+
+    def __init__(self, status="ready"):
+        self.status = status
+        self.load_error = None
+        self.model = SimpleNamespace(version="stub-version")
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def get(self):
+        if self.status == "error":
+            raise ModelLoadError(f"model failed to load: {self.load_error}")
+        return self.model
+
+    def predict(self, batch):
+        predictions = np.zeros((len(batch), len(CLASS_TABLE)), dtype=np.float32)
+        predictions[:, PREDICTED] = 1.0
+        return predictions
+
+
+def png_bytes(seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(32, 32, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def multipart(field, files):
+    boundary = uuid.uuid4().hex
+    body = b""
+    for filename, data in files:
+        body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+                 f"Content-Type: application/octet-stream\r\n\r\n").encode() + data + b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+class ApiTestCase(AsyncHTTPTestCase):
+    max_queue = 8
+
+    def get_app(self):
+        self.registry = StubRegistry()
+        # A fresh memory-only cache per test, so no test is answered from another's predictions
+        self.service = PredictionService(registry=self.registry, cache=PredictionCache(db_path=""),
+                                         workers=2, max_queue=self.max_queue)
+        return make_app(self.service, max_body_bytes=2**20, max_images=2)
+
+    def tearDown(self):
+        self.service.close()
+        super().tearDown()
+
+    def post(self, path, body, headers=None):
+        return self.fetch(path, method="POST", body=body, headers=headers)
+
+
+class ApiServerTest(ApiTestCase):
+    def test_predict(self):
+        response = self.post("/v1/predict", png_bytes())
+        self.assertEqual(response.code, 200)
+        result = json.loads(response.body)
+        self.assertEqual(result["class_name"], CLASS_TABLE[PREDICTED].label)
+        self.assertEqual(result["model_version"], "stub-version")
+
+    def test_batch_predict_reports_bad_images_per_image(self):
+        body, headers = multipart("images", [("leaf.png", png_bytes(1)), ("broken.png", b"not an image")])
+        response = self.post("/v1/predict/batch", body, headers)
+        self.assertEqual(response.code, 200)
+        good, bad = json.loads(response.body)["results"]
+        self.assertEqual(good["class_name"], CLASS_TABLE[PREDICTED].label)
+        self.assertIn("error", bad)
+
+    def test_bad_image_is_400(self):
+        response = self.post("/v1/predict", b"not an image")
+        self.assertEqual(response.code, 400)
+        self.assertIn("could not decode image", json.loads(response.body)["error"])
+
+    def test_image_over_pixel_limit_is_400(self):
+        with mock.patch.object(settings, "MAX_IMAGE_PIXELS", 32 * 32 - 1):
+            response = self.post("/v1/predict", png_bytes(2))
+        self.assertEqual(response.code, 400)
+        self.assertIn("pixel limit", json.loads(response.body)["error"])
+
+    def test_too_many_images_is_413(self):
+        body, headers = multipart("images", [(f"{i}.png", png_bytes(i)) for i in range(3)])
+        response = self.post("/v1/predict/batch", body, headers)
+        self.assertEqual(response.code, 413)
+
+    def test_body_too_large_is_413(self):
+        response = self.post("/v1/predict", b"\0" * (2**20 + 1))
+        self.assertEqual(response.code, 413)
+
+    def test_failed_model_load_is_503(self):
+        self.registry.status = "error"
+        self.registry.load_error = OSError("model file is truncated")
+        response = self.post("/v1/predict", png_bytes())
+        self.assertEqual(response.code, 503)
+        self.assertEqual(json.loads(response.body), {"status": "error", "error": "model file is truncated"})
+
+    def test_readyz_reports_loading_then_ready(self):
+        self.registry.status = "loading"
+        response = self.fetch("/readyz")
+        self.assertEqual(response.code, 503)
+        self.assertEqual(json.loads(response.body)["status"], "loading")
+
+        self.registry.status = "ready"
+        response = self.fetch("/readyz")
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)["model_version"], "stub-version")
+
+    def test_readyz_reports_idle_registry(self):
+        self.registry.status = "idle"
+        response = self.fetch("/readyz")
+        self.assertEqual(response.code, 503)
+        self.assertEqual(json.loads(response.body), {"status": "idle"})
+
+    def test_readyz_reports_load_error(self):
+        self.registry.status = "error"
+        self.registry.load_error = OSError("model file is truncated")
+        response = self.fetch("/readyz")
+        self.assertEqual(response.code, 503)
+        self.assertEqual(json.loads(response.body), {"status": "error", "error": "model file is truncated"})
+
+
+    def test_close_unregisters_metrics(self):
+        self.fetch("/metrics")
+        self.service.close()
+        self.assertNotIn(self.service._collect, METRICS._collectors)
+
+
+class FullQueueTest(ApiTestCase):
+    max_queue = 0
+
+    def test_full_queue_is_429_with_retry_after(self):
+        response = self.post("/v1/predict", png_bytes())
+        self.assertEqual(response.code, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")